@@ -1,3 +1,16 @@
+import os
+
 CHUNK_SIZE = 1000  # Size of each text chunk
 CHUNK_OVERLAP = 200  # Overlap between chunks to maintain context
-OPENAI_API_KEY = "sk-..."  # Replace with your OpenAI API key
\ No newline at end of file
+MAX_CHUNK_SIZE = 10000  # Pages longer than this are split into overlapping windows
+TEXT_PDF_MIN_CHARS_PER_PAGE = 200  # Average extractable characters per page above which a PDF is treated as text (no OCR needed)
+EMBEDDING_MODEL = "text-embedding-3-small"  # Pinned, the similarity thresholds below are calibrated against this model
+EMBEDDING_BATCH_SIZE = 256  # Texts per embeddings request; whole pages, so kept well under the per-request token cap
+SEMANTIC_CACHE_THRESHOLD = 0.98  # Cosine similarity above which a chunk counts as a near-duplicate and is skipped; pages on one topic often score >0.9, so only near-copies may pass
+ANSWER_CACHE_THRESHOLD = 0.95  # Cosine similarity above which a question reuses the answer of an earlier one (only with --reuse-similar-answers)
+try:
+    MAX_CONCURRENT_REQUESTS = max(1, int(os.environ.get("OPENAI_CONCURRENCY", "8")))  # In-flight API requests; the bottleneck is the rate limit, not the CPU (0 would deadlock the semaphore)
+except ValueError:
+    # A non-numeric value would otherwise crash the CLI at import time
+    MAX_CONCURRENT_REQUESTS = 8
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "sk-...")  # Set OPENAI_API_KEY or replace the placeholder with your OpenAI API key
\ No newline at end of file
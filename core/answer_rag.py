@@ -1,39 +1,88 @@
 from core.question_gen import Question
-from openai import OpenAI
-import os
-
-def generate_answer(question: Question, vectorstore, language="german"):
-    prompt = """
-    Respond to the following question using the provided context. Be concise and clear. Responses should be no longer than 1 or 2 sentences.
-    Only use the information provided in the context to answer the question. Provide the answer in {language}.
-    
-    use HTML formatting where helpful:
-        - Use <strong></strong> for key terms. (Do NOT use ** or __)
-        - Use <ul><li>...</li></ul> for bullet points.
-        - <table> for comparisons.
-    
+from openai import AsyncOpenAI
+from utils.openai_client import get_client, create_async_client
+from config import MAX_CONCURRENT_REQUESTS
+import asyncio
+import textwrap
+
+ANSWER_PROMPT = textwrap.dedent("""\
+    Answer the question in {language} in 1-2 concise sentences, using only the context.
+    Use HTML where helpful: <strong></strong> for key terms (never ** or __), <ul><li>...</li></ul> for lists, <table> for comparisons.
     Context: {context}
-    Question: [{question_type}] {question}
-    """
+    Question: [{question_type}] {question}""")
 
-    relevant_chunks = vectorstore.similarity_search(question.question, k=4)
-    context = "\n".join(chunk.page_content for chunk in relevant_chunks)
+def retrieve_contexts(questions: list[Question], vectorstore, k=4, vectors=None) -> list[str]:
+    """Embed all questions in one request (unless vectors are given), then look up each question's context in the local index"""
+    if vectors is None:
+        vectors = vectorstore.embeddings.embed_documents([q.question for q in questions])
+    contexts = []
+    for vector in vectors:
+        relevant_chunks = vectorstore.similarity_search_by_vector(vector, k=k)
+        contexts.append("\n".join(chunk.page_content for chunk in relevant_chunks))
+    return contexts
 
-    prompt = prompt.format(
+def _answer_prompt(question: Question, context: str, language: str) -> str:
+    return ANSWER_PROMPT.format(
         context=context,
         question=question.question,
         question_type=question.card_type,
         language=language
     )
 
-    api_key = os.environ.get("OPENAI_API_KEY")
-    client = OpenAI(api_key=api_key)
-    response = client.responses.create(
+def _answer_request(prompt: str) -> dict:
+    return dict(
         model="gpt-4o-mini",
         input=[
             {"role": "user", "content": prompt}
         ]
     )
 
+def _cached_answer(prompt: str, cache):
+    """Return (key, answer) for a prompt; answer is None on a cache miss or without a cache"""
+    if cache is None:
+        return None, None
+    key = cache.make_key(model="gpt-4o-mini", prompt=prompt)
+    return key, cache.get(key)
+
+def _store_answer(response, key, cache) -> str:
     content = response.output_text.strip()
-    return content
\ No newline at end of file
+    if cache is not None:
+        cache.set(key, content)
+    return content
+
+def generate_answer(question: Question, vectorstore, language="german", cache=None, context=None):
+    """Answer a single question synchronously; the pipeline uses generate_answers"""
+    if context is None:
+        relevant_chunks = vectorstore.similarity_search(question.question, k=4)
+        context = "\n".join(chunk.page_content for chunk in relevant_chunks)
+
+    prompt = _answer_prompt(question, context, language)
+    key, cached = _cached_answer(prompt, cache)
+    if cached is not None:
+        return cached
+    return _store_answer(get_client().responses.create(**_answer_request(prompt)), key, cache)
+
+async def agenerate_answer(question: Question, context: str, client: AsyncOpenAI, language="german", cache=None):
+    """Async variant of generate_answer for an already retrieved context"""
+    prompt = _answer_prompt(question, context, language)
+    key, cached = _cached_answer(prompt, cache)
+    if cached is not None:
+        return cached
+    return _store_answer(await client.responses.create(**_answer_request(prompt)), key, cache)
+
+def generate_answers(questions: list[Question], contexts: list[str], language="german", cache=None, max_workers=MAX_CONCURRENT_REQUESTS, on_done=None):
+    """Answer all questions concurrently on one event loop; answers are returned in question order"""
+    return asyncio.run(_answer_all(questions, contexts, language, cache, max_workers, on_done))
+
+async def _answer_all(questions, contexts, language, cache, max_workers, on_done):
+    async with create_async_client() as client:
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def _one(question, context):
+            async with semaphore:
+                answer = await agenerate_answer(question, context, client, language=language, cache=cache)
+            if on_done is not None:
+                on_done()
+            return answer
+
+        return await asyncio.gather(*(_one(q, c) for q, c in zip(questions, contexts)))
@@ -1,10 +1,41 @@
+import hashlib
+from collections import defaultdict
+from config import MAX_CHUNK_SIZE, CHUNK_OVERLAP
+
 def chunk_by_page_number(pages):
-    text_by_page = []
+    # Collect the fragments of each page in a single pass and join once, instead of growing strings with +=
+    fragments_by_page = defaultdict(list)
     for doc in pages:
-        page = doc.metadata["page_number"]-1
-        if page >= len(text_by_page):
-            text_by_page.append("")
+        fragments = fragments_by_page[doc.metadata["page_number"]-1]
         if doc.metadata["category"] == "Table":
-            text_by_page[page] += doc.metadata["text_as_html"]
-        text_by_page[page] += doc.page_content + '\n'
-    return text_by_page
\ No newline at end of file
+            fragments.append(doc.metadata["text_as_html"])
+        fragments.append(doc.page_content)
+        fragments.append('\n')
+    return ["".join(fragments_by_page[page]) for page in sorted(fragments_by_page)]
+
+def split_long_chunks(chunks, max_size=MAX_CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    # Pages longer than max_size (e.g. big HTML tables) are cut into overlapping windows, keeping every request within budget
+    step = max_size - overlap
+    split_chunks = []
+    for chunk in chunks:
+        if len(chunk) <= max_size:
+            split_chunks.append(chunk)
+        else:
+            starts = list(range(0, len(chunk) - overlap, step))
+            # A last window that adds no more than `overlap` new characters would be mostly repeated text, so merge it into the previous one
+            if len(starts) > 1 and len(chunk) - (starts[-2] + max_size) <= overlap:
+                starts.pop()
+            split_chunks.extend(chunk[i:i+max_size] for i in starts[:-1])
+            split_chunks.append(chunk[starts[-1]:])
+    return split_chunks
+
+def dedupe_chunks(chunks):
+    # Identical pages (repeated slides, title pages, ...) would only be embedded and turned into the same cards again
+    seen = set()
+    unique_chunks = []
+    for chunk in chunks:
+        digest = hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+        if digest not in seen:
+            seen.add(digest)
+            unique_chunks.append(chunk)
+    return unique_chunks
\ No newline at end of file
@@ -1,41 +1,53 @@
-import random
 import csv
+import hashlib
+from collections import Counter
 import genanki
 from typing import List, Tuple
+from utils.logger import get_logger
+
+log = get_logger(__name__)
+
+def _stable_id(name: str) -> int:
+    """Derive a genanki ID in [2**30, 2**31) from a name, so regenerated decks keep the same IDs"""
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=4).digest()
+    return (1 << 30) + int.from_bytes(digest, "big") % (1 << 30)
+
+# The card model never changes, so it is built once with a fixed ID and shared by every deck
+MODEL = genanki.Model(
+    _stable_id("PDF QA Model v1"),
+    'PDF QA Model',
+    fields=[
+        {'name': 'Question'},
+        {'name': 'Answer'},
+    ],
+    templates=[
+        {
+            'name': 'Card',
+            'qfmt': '{{Question}}',
+            'afmt': '{{FrontSide}}<hr id="answer">{{Answer}}',
+        },
+    ]
+)
 
 def create_anki_deck(qa_pairs: List[Tuple[str, str]], deck_name: str) -> genanki.Deck:
         """Create an Anki deck from the generated QA pairs"""
-        # Create unique IDs for model and deck
-        model_id = random.randrange(1 << 30, 1 << 31)
-        deck_id = random.randrange(1 << 30, 1 << 31)
-
-        # Create the model for the cards
-        model = genanki.Model(
-            model_id,
-            'PDF QA Model',
-            fields=[
-                {'name': 'Question'},
-                {'name': 'Answer'},
-            ],
-            templates=[
-                {
-                    'name': 'Card',
-                    'qfmt': '{{Question}}',
-                    'afmt': '{{FrontSide}}<hr id="answer">{{Answer}}',
-                },
-            ]
-        )
+        # A deterministic ID lets Anki match a re-imported deck to the existing one and keep review history
+        deck_id = _stable_id(deck_name)
 
         # Create the deck
         deck = genanki.Deck(deck_id, deck_name)
 
-        # Add cards to the deck
+        # The GUID is derived from the deck and the question, so a regenerated answer updates the
+        # existing note on re-import instead of duplicating it. A repeated question within the deck
+        # also hashes its occurrence index, otherwise Anki would merge the two notes into one
+        occurrences = Counter()
+        notes = []
         for question, answer in qa_pairs:
-            note = genanki.Note(
-                model=model,
-                fields=[question, answer],
-            )
-            deck.add_note(note)
+            index = occurrences[question]
+            occurrences[question] += 1
+            guid = genanki.guid_for(deck_name, question, index)
+            notes.append(genanki.Note(model=MODEL, fields=[question, answer], guid=guid))
+        deck.notes = notes
 
         return deck
 
@@ -43,15 +55,13 @@ def download_deck(deck: genanki.Deck, output_path: str, save_csv: bool = True):
         """Save the Anki deck to a file"""
         if save_csv:
             csv_path = output_path.replace('.apkg', '.csv')
-            print(f"Saving flashcards to CSV: {csv_path}")
-            with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+            log.debug("Saving flashcards to CSV: %s", csv_path)
+            # Large buffer + writerows: the rows reach the OS in a few big writes
+            with open(csv_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
                 writer = csv.writer(csvfile)
                 writer.writerow(['Question', 'Answer'])
-                for note in deck.notes:
-                    writer.writerow([note.fields[0], note.fields[1]])
-            print(f"CSV file saved: {csv_path}")
+                writer.writerows((note.fields[0], note.fields[1]) for note in deck.notes)
             
         # Save the deck to an Anki package file
-        print(f"Saving deck to {output_path}")
+        log.debug("Saving deck to %s", output_path)
         genanki.Package(deck).write_to_file(output_path)
-        print("Deck saved successfully!")
@@ -1,12 +1,25 @@
 from langchain_community.document_loaders import UnstructuredPDFLoader
 from langchain_core.globals import set_verbose, set_debug
+from langchain_core.documents import Document
+from typing import Iterator
+from core.chunker import chunk_by_page_number
+from config import TEXT_PDF_MIN_CHARS_PER_PAGE
+import fitz  # PyMuPDF
+import hashlib
+import json
+import os
 
-def load_pdf_unstructured(pdf_path: str, chunk: bool = False, languages: [str] = ['english']) -> UnstructuredPDFLoader:
+PAGES_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "pdf2anki", "pages")
+
+def load_pdf_unstructured(pdf_path: str, chunk: bool = False, languages: [str] = ['english'], strategy: str = "hi_res") -> Iterator[Document]:
     """
     Load a PDF file using UnstructuredPDFLoader with specific configurations.
     
+    "hi_res" runs the layout detection model (needed for table structure), "fast" only
+    extracts the embedded text and is much cheaper for plain text PDFs.
+    
     Returns:
-        UnstructuredPDFLoader: Configured loader for the PDF file.
+        Iterator[Document]: The PDF elements, yielded lazily so callers can consume them one at a time.
     """
     # Create an instance of UnstructuredPDFLoader with specified parameters
     set_verbose(False)
@@ -15,7 +28,7 @@ def load_pdf_unstructured(pdf_path: str, chunk: bool = False, languages: [str] =
     loader = UnstructuredPDFLoader(
         pdf_path,
         infer_table_structure=True,
-        strategy="hi_res",
+        strategy=strategy,
         chunk_strategy = "basic" if chunk else None,
         include_orig_elements=False,
         mode="elements",
@@ -23,4 +36,57 @@ def load_pdf_unstructured(pdf_path: str, chunk: bool = False, languages: [str] =
         languages=languages,
     )
     
-    return loader.load()
\ No newline at end of file
+    return loader.lazy_load()
+
+def read_pdf_text(pdf_path: str) -> list[str]:
+    """
+    Extract the embedded text of every page with PyMuPDF, without OCR or layout analysis.
+    
+    Returns:
+        list[str]: The text of each page, in unsorted (content stream) order.
+    """
+    with fitz.open(pdf_path) as doc:
+        return [page.get_text("text", sort=False) for page in doc]
+
+def load_pdf_pages(pdf_path: str, languages: [str] = ['english'], strategy: str = "hi_res", use_cache: bool = True) -> list[str]:
+    """
+    Load a PDF and return its text grouped by page.
+    
+    With strategy "auto", PDFs that already contain a text layer are read directly with PyMuPDF,
+    which is often 10x+ faster than unstructured; only scanned PDFs go through "hi_res".
+    
+    Parsing (especially "hi_res") is by far the slowest local step, so the result is cached on disk,
+    keyed by the file contents and the loader settings. Re-runs with e.g. another card count skip it.
+    
+    Returns:
+        list[str]: The text of each page.
+    """
+    if use_cache:
+        digest = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(json.dumps([languages, strategy]).encode("utf-8"))
+        cache_path = os.path.join(PAGES_CACHE_DIRECTORY, digest.hexdigest() + ".json")
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                return json.load(f)
+
+    pages = None
+    if strategy == "auto":
+        text_pages = read_pdf_text(pdf_path)
+        if sum(len(p) for p in text_pages) >= TEXT_PDF_MIN_CHARS_PER_PAGE * max(len(text_pages), 1):
+            pages = [p for p in text_pages if p.strip()]
+        else:
+            strategy = "hi_res"
+    if pages is None:
+        # Elements are streamed from the loader straight into the page chunker
+        pages = chunk_by_page_number(load_pdf_unstructured(pdf_path, chunk=True, languages=languages, strategy=strategy))
+
+    if use_cache:
+        os.makedirs(PAGES_CACHE_DIRECTORY, exist_ok=True)
+        # Write then rename, so an interrupted run never leaves a truncated cache file behind
+        with open(cache_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(pages, f, ensure_ascii=False)
+        os.replace(cache_path + ".tmp", cache_path)
+    return pages
\ No newline at end of file
@@ -1,7 +1,10 @@
 from pydantic import BaseModel
 from typing import List, Tuple
-from config import OPENAI_API_KEY 
-from openai import OpenAI
+import asyncio
+import textwrap
+from functools import lru_cache
+from config import MAX_CONCURRENT_REQUESTS
+from utils.openai_client import create_async_client
 
 class Question(BaseModel):
     card_type: str
@@ -10,41 +13,101 @@ class Question(BaseModel):
 class Questions(BaseModel):
     questions: list[Question]
 
-def generate_questions(chunks, language="german", questions_per_chunk=10):
-    prompt = """
-            You're an assistant creating flashcards from academic material.
-            Given the following text, generate questions in {language} for each of the following flashcard types:
-            
-            Definition: What is the definition of the key concept in the text?
-            Fact Recall: What is a key fact mentioned in the text?
-            Conceptual Understanding: How does the concept in the text relate to other concepts?
-            Application: How can the concept in the text be applied in a real-world scenario?
-            Comparison: How does the concept in the text compare to similar concepts?
-            Classification: How would you classify the concept in the text?
-            Cloze: Create a fill-in-the-blank question based on the text.
-            True/False: Create a true/false statement based on the text.
-            Cause-Effect: What cause-and-effect relationships are described in the text?
-            Study/Finding: What is a key study or finding mentioned in the text?
-
-            Only generate questions for the types that are relevant to the text. 
-            
-            !!! GENERATE EXACTLY {count} questions !!!
-            
-            TEXT:
-            \"\"\"{your_chunk_here}\"\"\"
-            """
-    
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    questions = []
-    for chunk in chunks:
-        user_prompt = prompt.format(your_chunk_here=chunk, language=language, count=questions_per_chunk)
-        response = openai_client.responses.parse(
-            model="gpt-4o-mini",
-            input=[
-                {"role": "user", "content": user_prompt}
-            ],
-            text_format = Questions
-        )
-        questions.extend(response.output_parsed.questions[:questions_per_chunk])
-        # print(f"Generated {len(response.output_parsed.questions)} questions for chunk {i+1}/{len(chunks)}")
-    return questions
\ No newline at end of file
+class QuestionBatches(BaseModel):
+    batches: list[Questions]
+
+# Prompts are sent once per request, so keep them free of indentation and filler tokens
+QUESTION_PROMPT = textwrap.dedent("""\
+    Create flashcard questions in {language} from the academic text below. Card types:
+    Definition: key concept's definition
+    Fact Recall: key fact
+    Conceptual Understanding: relation to other concepts
+    Application: real-world use
+    Comparison: comparison with similar concepts
+    Classification: how to classify the concept
+    Cloze: fill-in-the-blank
+    True/False: true/false statement
+    Cause-Effect: cause-and-effect relationships
+    Study/Finding: key study or finding
+    Only use types relevant to the text. Generate exactly {count} questions.
+    TEXT:
+    \"\"\"""")
+
+BATCH_PROMPT = textwrap.dedent("""\
+    The text below contains {n} sections, each starting with a ---CHUNK i--- marker.
+    Treat every section as a separate text and return one entry in "batches" per section, in the same order.
+    Generate exactly {count} questions for each section, not in total.
+    """)
+
+@lru_cache(maxsize=32)
+def _prompt_head(language, count):
+    # Only the chunk changes between requests, the instructions are formatted once per (language, count)
+    return QUESTION_PROMPT.format(language=language, count=count)
+
+def drop_near_duplicates(chunks, semantic_cache, vectors=None):
+    """Return the chunks that are not a near-copy of an earlier one (a re-shown slide, a page with one line added)
+
+    Of a group of near-copies the longest one is kept, at the position of the first, so build-up slides keep their full content
+    """
+    if vectors is None:
+        vectors = semantic_cache.embed(chunks)
+    unique_chunks = []
+    for chunk, vector in zip(chunks, vectors):
+        position = semantic_cache.lookup(vector)
+        if position is None:
+            semantic_cache.add(vector, len(unique_chunks))
+            unique_chunks.append(chunk)
+        elif len(chunk) > len(unique_chunks[position]):
+            semantic_cache.replace(position, vector, position)
+            unique_chunks[position] = chunk
+    return unique_chunks
+
+def generate_questions(chunks, language="german", questions_per_chunk=10, max_workers=MAX_CONCURRENT_REQUESTS, cache=None, chunks_per_request=1):
+    return asyncio.run(_generate_all(chunks, language, questions_per_chunk, max_workers, cache, chunks_per_request))
+
+async def _generate_all(chunks, language, questions_per_chunk, max_workers, cache, chunks_per_request):
+    # One client for the whole run
+    async with create_async_client() as openai_client:
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def _parse(user_prompt, text_format):
+            if cache is not None:
+                key = cache.make_key(model="gpt-4o-mini", prompt=user_prompt, text_format=text_format.__name__)
+                cached = cache.get(key)
+                if cached is not None:
+                    return text_format.model_validate(cached)
+
+            async with semaphore:
+                response = await openai_client.responses.parse(
+                    model="gpt-4o-mini",
+                    input=[
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    text_format = text_format
+                )
+            if cache is not None:
+                cache.set(key, response.output_parsed.model_dump())
+            return response.output_parsed
+
+        async def _one(chunk):
+            user_prompt = _prompt_head(language, questions_per_chunk) + chunk + '"""'
+            parsed = await _parse(user_prompt, Questions)
+            return [parsed.questions[:questions_per_chunk]]
+
+        async def _batch(group):
+            if len(group) == 1:
+                return await _one(group[0])
+            # Several chunks share one request to amortize the fixed per-request overhead
+            text = "".join(f"\n---CHUNK {i}---\n{chunk}" for i, chunk in enumerate(group, 1))
+            user_prompt = BATCH_PROMPT.format(n=len(group), count=questions_per_chunk) + _prompt_head(language, questions_per_chunk) + text + '"""'
+            parsed = await _parse(user_prompt, QuestionBatches)
+            if len(parsed.batches) != len(group) or any(len(batch.questions) < questions_per_chunk for batch in parsed.batches):
+                # The model did not keep the sections apart or spread the count over them, fall back to one request per chunk
+                results = await asyncio.gather(*(_one(chunk) for chunk in group))
+                return [questions for result in results for questions in result]
+            return [batch.questions[:questions_per_chunk] for batch in parsed.batches]
+
+        # All requests are in flight at once (bounded by the semaphore); gather keeps chunk order
+        groups = [chunks[i:i + chunks_per_request] for i in range(0, len(chunks), chunks_per_request)]
+        results = await asyncio.gather(*(_batch(group) for group in groups))
+    return [question for result in results for chunk_questions in result for question in chunk_questions]
@@ -0,0 +1,56 @@
+import threading
+import numpy as np
+from config import SEMANTIC_CACHE_THRESHOLD
+
+class SemanticCache:
+    """In-memory cache that returns a stored value when a new text is close enough in embedding space."""
+
+    def __init__(self, embedding, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+        self.embedding = embedding
+        self.threshold = threshold
+        # Unit vectors stacked in one float32 matrix (rows beyond _size are spare capacity), so a lookup is a single matmul
+        self._matrix = None
+        self._size = 0
+        self._values = []
+        self._lock = threading.Lock()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed texts in one batch and normalize each vector to unit length"""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return self.normalize(self.embedding.embed_documents(texts))
+
+    @staticmethod
+    def normalize(vectors) -> np.ndarray:
+        """Normalize already computed embeddings to unit length"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def lookup(self, vector: np.ndarray):
+        """Return the value of the most similar cached entry above the threshold, or None"""
+        with self._lock:
+            if self._size == 0:
+                return None
+            scores = self._matrix[:self._size] @ vector
+            best = int(np.argmax(scores))
+            return self._values[best] if scores[best] >= self.threshold else None
+
+    def add(self, vector: np.ndarray, value):
+        with self._lock:
+            if self._matrix is None or self._size == len(self._matrix):
+                # Double the capacity so appending stays amortized O(1) instead of copying on every add
+                grown = np.empty((max(16, 2 * self._size), len(vector)), dtype=np.float32)
+                if self._size:
+                    grown[:self._size] = self._matrix[:self._size]
+                self._matrix = grown
+            self._matrix[self._size] = vector
+            self._values.append(value)
+            self._size += 1
+
+    def replace(self, position: int, vector: np.ndarray, value):
+        """Overwrite the entry added at `position` (0-based, in insertion order)"""
+        with self._lock:
+            self._matrix[position] = vector
+            self._values[position] = value
@@ -1,9 +1,64 @@
+import hashlib
+import os
+from functools import lru_cache
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
 from langchain.docstore.document import Document
-from config import OPENAI_API_KEY
+from langchain_core.embeddings import Embeddings
+from config import OPENAI_API_KEY, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE
 
-def build_vectorstore(chunks, ):
-    docs = [Document(page_content=c) for c in chunks]
-    embedding = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-    return Chroma.from_documents(docs, embedding)
\ No newline at end of file
+PERSIST_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "pdf2anki", "chroma")
+EMBEDDING_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "pdf2anki", "embeddings")
+
+@lru_cache(maxsize=None)
+def get_embeddings(*, use_cache: bool = True):
+    # Keyword-only: lru_cache keys positional and keyword calls differently, which would build a second client
+    # Embed many chunks per request instead of paying a round-trip per chunk
+    embedding = OpenAIEmbeddings(model=EMBEDDING_MODEL, openai_api_key=OPENAI_API_KEY, chunk_size=EMBEDDING_BATCH_SIZE, max_retries=6, request_timeout=60)
+    if not use_cache:
+        return embedding
+    # Vectors are stored on disk under a hash of (model, text); only texts never seen before are sent to the API
+    return CacheBackedEmbeddings.from_bytes_store(embedding, LocalFileStore(EMBEDDING_CACHE_DIRECTORY), namespace=embedding.model)
+
+class _PrecomputedEmbeddings(Embeddings):
+    """Serves vectors that were already computed for known texts and only embeds the rest"""
+
+    def __init__(self, embedding, vectors_by_text):
+        self.embedding = embedding
+        self.vectors_by_text = vectors_by_text
+
+    def embed_documents(self, texts):
+        missing = [t for t in texts if t not in self.vectors_by_text]
+        computed = dict(zip(missing, self.embedding.embed_documents(missing))) if missing else {}
+        return [self.vectors_by_text[t] if t in self.vectors_by_text else computed[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.embedding.embed_query(text)
+
+def build_vectorstore(chunks, collection_key=None, vectors=None):
+    # A persistent collection means caching is enabled, so the embedding cache is used as well
+    embedding = get_embeddings(use_cache=collection_key is not None)
+    if vectors is not None:
+        # The caller already embedded these chunks, don't pay for them a second time
+        embedding = _PrecomputedEmbeddings(embedding, dict(zip(chunks, vectors)))
+    if collection_key is None:
+        docs = [Document(page_content=c) for c in chunks]
+        return Chroma.from_documents(docs, embedding)
+
+    # Persistent collection per (source, embedding model), chunks are keyed by content hash so unchanged ones are never re-embedded.
+    # The model is part of the key: vectors from another model can have the same dimension and would be queried silently
+    collection_name = "pdf2anki-" + hashlib.sha256(f"{EMBEDDING_MODEL}\0{collection_key}".encode("utf-8")).hexdigest()[:32]
+    store = Chroma(collection_name=collection_name, embedding_function=embedding, persist_directory=PERSIST_DIRECTORY)
+
+    chunks_by_id = {hashlib.sha256(c.encode("utf-8")).hexdigest(): c for c in chunks}
+    existing_ids = set(store.get(include=[])["ids"])
+    missing_ids = [i for i in chunks_by_id if i not in existing_ids]
+    if missing_ids:
+        store.add_texts([chunks_by_id[i] for i in missing_ids], ids=missing_ids)
+    # Drop chunks from an older version of the source so they don't show up in retrieval
+    stale_ids = [i for i in existing_ids if i not in chunks_by_id]
+    if stale_ids:
+        store.delete(ids=stale_ids)
+    return store
\ No newline at end of file
@@ -1,35 +1,92 @@
-from core.loader import load_pdf_unstructured
-from core.chunker import chunk_by_page_number
-from core.vectorstore import build_vectorstore
-from core.question_gen import generate_questions
-from core.answer_rag import generate_answer
+from core.loader import load_pdf_pages
+from core.chunker import split_long_chunks, dedupe_chunks
+from core.vectorstore import build_vectorstore, get_embeddings
+from core.question_gen import generate_questions, drop_near_duplicates
+from core.semantic_cache import SemanticCache
+from core.answer_rag import generate_answers, retrieve_contexts
 from core.export import create_anki_deck, download_deck
+from utils.cache import ResponseCache
+from config import MAX_CONCURRENT_REQUESTS, ANSWER_CACHE_THRESHOLD
+from concurrent.futures import ThreadPoolExecutor
 import argparse
+import os
+from tqdm import tqdm
 
-def main(pdf_path, language="English", count=5, output_path="flashcards.apkg", deck_name="Flashcards"):
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def main(pdf_path, language="English", count=5, output_path="flashcards.apkg", deck_name="Flashcards", workers=MAX_CONCURRENT_REQUESTS, use_cache=True, chunks_per_request=1, strategy="hi_res", dedupe=True, similar_answers=False):
+    cache = ResponseCache() if use_cache else None
     
     print(f"Loading PDF file: {pdf_path}", end="")
-    pages = load_pdf_unstructured(pdf_path, chunk = True, languages=[language])
+    chunks = dedupe_chunks(split_long_chunks(load_pdf_pages(pdf_path, languages=[language], strategy=strategy, use_cache=use_cache)))
     print(" - done")
     
-    print(f"Chunking PDF into pages", end="")    
-    chunks = chunk_by_page_number(pages)
-    print(" - done")
+    question_chunks, chunk_vectors = chunks, None
+    if dedupe:
+        print("Skipping near-duplicate chunks", end="")
+        # The chunks are embedded once here and the vectors are reused for the vectorstore
+        chunk_cache = SemanticCache(get_embeddings(use_cache=use_cache))
+        chunk_vectors = chunk_cache.embedding.embed_documents(chunks)
+        question_chunks = drop_near_duplicates(chunks, chunk_cache, chunk_cache.normalize(chunk_vectors))
+        print(f" - {len(chunks) - len(question_chunks)} of {len(chunks)} skipped")
     
-    print(f"Building vectorstore from {len(chunks)} chunks", end="")
-    store = build_vectorstore(chunks)
-    print(" - done")
+    # Building the vectorstore and generating questions are independent, so overlap them
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        print(f"Building vectorstore from {len(chunks)} chunks in the background")
+        store_future = executor.submit(build_vectorstore, chunks,
+                                       collection_key=os.path.abspath(pdf_path) if use_cache else None,
+                                       vectors=chunk_vectors)
 
-    print(f"Generating {count} questions per chunk in {language}", end="")
-    questions = generate_questions(chunks, language=language, questions_per_chunk=count)
-    print(" - done")
+        print(f"Generating {count} questions per chunk in {language}", end="")
+        questions = generate_questions(question_chunks, language=language, questions_per_chunk=count, max_workers=workers, cache=cache,
+                                       chunks_per_request=chunks_per_request)
+        print(" - done")
+
+        print(f"Waiting for vectorstore", end="")
+        store = store_future.result()
+        print(" - done")
     
-    cards = []
-    for i, q in enumerate(questions):
-        print(f"\rGenerating answer for question {i+1}/{len(questions)}", end="")
-        cards.append((q.question, generate_answer(q, store, language=language)))
+    print(f"Retrieving context for {len(questions)} questions", end="")
+    # Generated questions change from run to run, so they bypass the on-disk embedding cache, which only grows;
+    # the vectors serve both the context lookup and the answer cache
+    question_vectors = get_embeddings(use_cache=False).embed_documents([q.question for q in questions])
+    answer_cache = SemanticCache(get_embeddings(use_cache=False), threshold=ANSWER_CACHE_THRESHOLD) if similar_answers else None
+    vectors = answer_cache.normalize(question_vectors) if answer_cache and question_vectors else None
+    contexts = retrieve_contexts(questions, store, vectors=question_vectors)
     print(" - done")
     
+    # A question repeated across neighbouring chunks reuses the answer of its first occurrence. Only the same
+    # card type with the same text (ignoring case and whitespace) counts, similar-looking questions about
+    # different concepts ("X requires labeled data" / "Y requires labeled data") must not share an answer
+    sources = []
+    first_by_key = {}
+    for i, question in enumerate(questions):
+        key = (question.card_type, " ".join(question.question.casefold().split()))
+        source = first_by_key.get(key) if dedupe else None
+        if source is None and answer_cache is not None:
+            # Opt-in: near-duplicate questions of the same card type and with the same context reuse it too
+            candidate = answer_cache.lookup(vectors[i])
+            if candidate is not None and questions[candidate].card_type == question.card_type and contexts[candidate] == contexts[i]:
+                source = candidate
+        if source is None:
+            source = i
+            first_by_key.setdefault(key, i)
+            if answer_cache is not None:
+                answer_cache.add(vectors[i], i)
+        sources.append(source)
+
+    # Answer requests are network-bound, so keep up to `workers` of them in flight on one event loop
+    unique = sorted(set(sources))
+    with tqdm(total=len(unique), desc="Generating answers") as progress:
+        unique_answers = generate_answers([questions[i] for i in unique], [contexts[i] for i in unique], language=language,
+                                          cache=cache, max_workers=workers, on_done=progress.update)
+    answers = dict(zip(unique, unique_answers))
+    cards = [(q.question, answers[source]) for q, source in zip(questions, sources)]
+    
     print(f"Creating Anki deck with {len(cards)} cards", end="")
     deck = create_anki_deck(cards, deck_name=deck_name)
     print(" - done")
@@ -44,9 +101,14 @@ if __name__ == "__main__":
     parser.add_argument("pdf_path", help="Path to the PDF file")
     parser.add_argument("-o", "--output", help="Output file path for the Anki package")
     parser.add_argument("-d", "--deck-name", help="Name for the Anki deck")
-    parser.add_argument("-w", "--workers", type=int, help="Number of parallel workers (default: use all available CPUs)", default=None)
+    parser.add_argument("-w", "--workers", type=positive_int, help="Number of parallel API requests (default: $OPENAI_CONCURRENCY or 8)", default=MAX_CONCURRENT_REQUESTS)
     parser.add_argument("-l", "--language", help="Target language for flashcards", default="English")
     parser.add_argument("-c", "--count", type=int, help="Number of flashcards to generate per chunk", default=5)
+    parser.add_argument("-b", "--chunks-per-request", type=positive_int, help="Number of chunks sent in a single question request (default: 1)", default=1)
+    parser.add_argument("-s", "--strategy", choices=["hi_res", "fast", "auto", "ocr_only"], help="PDF partitioning strategy; 'fast' skips layout analysis, 'auto' reads text PDFs directly and only runs hi_res on scans (default: hi_res)", default="hi_res")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the on-disk page, embedding and response caches")
+    parser.add_argument("--no-dedupe", action="store_true", help="Generate questions for near-duplicate chunks and answer repeated questions separately (identical chunks are always dropped)")
+    parser.add_argument("--reuse-similar-answers", action="store_true", help="Also reuse an answer for questions that are only similar (same card type and context); may put an answer on the wrong card")
     
     args = parser.parse_args()
     
@@ -54,4 +116,10 @@ if __name__ == "__main__":
          language=args.language,
          count=args.count,
          output_path=args.output if args.output else "flashcards.apkg",
-         deck_name=args.deck_name if args.deck_name else "Flashcards")
\ No newline at end of file
+         deck_name=args.deck_name if args.deck_name else "Flashcards",
+         workers=args.workers,
+         use_cache=not args.no_cache,
+         chunks_per_request=args.chunks_per_request,
+         strategy=args.strategy,
+         dedupe=not args.no_dedupe,
+         similar_answers=args.reuse_similar_answers)
\ No newline at end of file
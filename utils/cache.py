@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pdf2anki", "responses.sqlite")
+
+class ResponseCache:
+    """Persistent exact-match cache for LLM responses, keyed by a hash of the request."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 100_000, memory_entries: int = 1024):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Recently used values are also kept in memory, so hot keys skip SQLite and JSON decoding
+        self._memory = OrderedDict()
+        self._memory_entries = memory_entries
+        # Shared between worker threads, so every access goes through the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)"
+            )
+            # Evict the least recently used entries once the cache grows past its limit
+            self._conn.execute(
+                "DELETE FROM responses WHERE key NOT IN "
+                "(SELECT key FROM responses ORDER BY accessed DESC LIMIT ?)",
+                (max_entries,)
+            )
+
+    @staticmethod
+    def make_key(**request) -> str:
+        """Hash the canonical JSON form of the request (model, prompt, output format, ...)"""
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            value = json.loads(row[0])
+            self._remember(key, value)
+        return value
+
+    def set(self, key: str, value):
+        """Store a JSON-serializable value under key"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, accessed) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time())
+            )
+            self._remember(key, value)
+
+    def _remember(self, key: str, value):
+        # Callers hold the lock
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
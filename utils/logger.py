@@ -1,9 +1,16 @@
 import logging
+import os
 import sys
+from functools import lru_cache
 
+# Loggers are process-wide singletons, so the handler setup only has to run once per name
+@lru_cache(maxsize=None)
 def get_logger(name: str = "pdf_to_anki") -> logging.Logger:
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    # INFO by default so debug messages cost nothing; set PDF2ANKI_LOG_LEVEL=DEBUG to see them
+    level = os.environ.get("PDF2ANKI_LOG_LEVEL", "INFO").upper()
+    # An unknown level name would raise at import time, so fall back to INFO instead
+    logger.setLevel(level if isinstance(logging.getLevelName(level), int) else logging.INFO)
 
     # Avoid duplicate handlers in Jupyter / reruns
     if not logger.handlers:
@@ -0,0 +1,20 @@
+from functools import lru_cache
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from config import OPENAI_API_KEY
+
+# HTTP/2 lets concurrent requests share a few connections instead of each opening its own
+_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+# The SDK retries 429/5xx responses with exponential backoff
+_MAX_RETRIES = 5
+
+@lru_cache(maxsize=1)
+def get_client() -> OpenAI:
+    # Built once and shared so every request reuses the same keep-alive connection pool
+    return OpenAI(api_key=OPENAI_API_KEY, max_retries=_MAX_RETRIES,
+                  http_client=DefaultHttpxClient(http2=True, limits=_LIMITS))
+
+def create_async_client() -> AsyncOpenAI:
+    # Not cached: an async connection pool can't outlive the event loop that created it, so build one per loop
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=_MAX_RETRIES,
+                       http_client=DefaultAsyncHttpxClient(http2=True, limits=_LIMITS))